@@ -3,22 +3,29 @@ Module for compiling and reporting metrics.
 """
 
 import logging
+import posixpath
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import UTC, datetime
-from typing import List, Optional
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple, Type
 
 import awswrangler as wr
+import numpy as np
 import pandas as pd
 from aind_settings_utils.aws import SecretsManagerBaseSettings
-from pydantic import Field, SecretStr
+from botocore.config import Config
+from pydantic import BaseModel, Field, SecretStr
 from pydantic_settings import SettingsConfigDict
 from vastpy import VASTClient
 
 from aind_vast_utils.models import (
     Capacity,
+    CapacityData,
     CapacityTableRow,
     Quota,
     QuotaTableRow,
+    TopCapacityTableRow,
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -56,6 +63,31 @@ class JobSettings(
     report_datetime: Optional[datetime] = Field(
         default_factory=lambda: datetime.now(UTC)
     )
+    s3_max_concurrency: int = Field(
+        default=64,
+        title="S3 Max Concurrency",
+        description=(
+            "Number of threads and pooled connections to use when writing "
+            "parquet files to S3. Only the max_pool_connections option of "
+            "awswrangler's botocore config is changed."
+        ),
+    )
+    s3_max_rows_by_file: Optional[int] = Field(
+        default=250_000,
+        title="S3 Max Rows By File",
+        description=(
+            "Max number of rows in each parquet file written to S3. Large "
+            "partitions are split into several files that upload in parallel."
+        ),
+    )
+    validate_responses: bool = Field(
+        default=False,
+        title="Validate Responses",
+        description=(
+            "Validate VAST API responses against the models. Useful for "
+            "debugging schema changes. Responses are trusted by default."
+        ),
+    )
 
 
 class CompileMetricsJob:
@@ -72,6 +104,16 @@ class CompileMetricsJob:
             address=job_settings.address,
         )
 
+    @staticmethod
+    def _construct_capacity_data(
+        entries: List[list],
+    ) -> List[Tuple[str, CapacityData]]:
+        """Build (folder, CapacityData) tuples from a trusted response."""
+        return [
+            (folder_name, CapacityData.model_construct(**folder_data))
+            for folder_name, folder_data in entries
+        ]
+
     def _get_capacity(self, path: str, sort_key: str = "logical") -> Capacity:
         """Get capacity info for VAST cluster."""
 
@@ -79,13 +121,25 @@ class CompileMetricsJob:
             path=path,
             type=sort_key,
         )
-        return Capacity.model_validate(response)
+        if self.job_settings.validate_responses:
+            return Capacity.model_validate(response)
+        return Capacity.model_construct(
+            **{
+                **response,
+                "details": self._construct_capacity_data(response["details"]),
+                "small_folders": self._construct_capacity_data(
+                    response["small_folders"]
+                ),
+            }
+        )
 
     def _get_quota(self, path: str) -> Quota:
         """Get quota info for VAST cluster."""
 
         response: List[dict] = self.vast_client.quotas.get(path=path)
-        return Quota.model_validate(response[0])
+        if self.job_settings.validate_responses:
+            return Quota.model_validate(response[0])
+        return Quota.model_construct(**response[0])
 
     def _map_to_quota_table_rows(
         self, quotas: List[Quota]
@@ -96,7 +150,7 @@ class CompileMetricsJob:
             row = QuotaTableRow(
                 report_datetime=self.job_settings.report_datetime,
                 path=quota.path,
-                state=quota.state,
+                state=(quota.state or "").upper(),
                 used_capacity=quota.used_capacity,
                 soft_limit=quota.soft_limit,
                 hard_limit=quota.hard_limit,
@@ -105,60 +159,156 @@ class CompileMetricsJob:
             all_rows.append(row)
         return all_rows
 
-    def _map_to_capacity_table_rows(
+    def _map_to_capacity_table_columns(
         self, capacity_info: Capacity
-    ) -> List[CapacityTableRow]:
-        """Map Capacity response to a CapacityTableRow"""
+    ) -> Dict[str, list]:
+        """
+        Map Capacity response to the columns of the capacity table. Main
+        folders are listed before small folders and each group is sorted by
+        logical size.
+        """
         key_map = dict(
             [(item, index) for index, item in enumerate(capacity_info.keys)]
         )
-        main_folders = []
-        for capacity_data in capacity_info.details:
-            folder_name = capacity_data[0]
-            folder_data = capacity_data[1]
-            row = CapacityTableRow(
-                report_datetime=self.job_settings.report_datetime,
-                path=folder_name,
-                is_small_folders=False,
-                usable=folder_data.data[key_map["usable"]],
-                unique=folder_data.data[key_map["unique"]],
-                logical=folder_data.data[key_map["logical"]],
-                parent=folder_data.parent,
-                percent=folder_data.percent,
-            )
-            main_folders.append(row)
-        small_folders = []
-        for capacity_data in capacity_info.small_folders:
-            folder_name = capacity_data[0]
-            folder_data = capacity_data[1]
-            row = CapacityTableRow(
-                report_datetime=self.job_settings.report_datetime,
-                path=folder_name,
-                is_small_folders=True,
-                usable=folder_data.data[key_map["usable"]],
-                unique=folder_data.data[key_map["unique"]],
-                logical=folder_data.data[key_map["logical"]],
-                parent=folder_data.parent,
-                percent=folder_data.percent,
-            )
-            small_folders.append(row)
-        main_folders.sort(key=lambda x: x.logical, reverse=True)
-        small_folders.sort(key=lambda x: x.logical, reverse=True)
-        all_folders = main_folders + small_folders
-        return all_folders
+        i_usable = key_map["usable"]
+        i_unique = key_map["unique"]
+        i_logical = key_map["logical"]
+        report_datetime = self.job_settings.report_datetime
+        columns = {field: [] for field in CapacityTableRow.model_fields}
+        # Sort plain tuples on the logical size with a C-level key getter
+        logical_key = itemgetter(3)
+        for is_small_folders, capacity_details in [
+            (False, capacity_info.details),
+            (True, capacity_info.small_folders),
+        ]:
+            entries = []
+            for folder_name, folder_data in capacity_details:
+                data = folder_data.data
+                entries.append(
+                    (
+                        folder_name,
+                        data[i_usable],
+                        data[i_unique],
+                        data[i_logical],
+                        folder_data.parent,
+                        folder_data.percent,
+                    )
+                )
+            entries.sort(key=logical_key, reverse=True)
+            for (
+                folder_name,
+                usable,
+                unique,
+                logical,
+                parent,
+                percent,
+            ) in entries:
+                columns["report_datetime"].append(report_datetime)
+                columns["path"].append(folder_name)
+                columns["is_small_folders"].append(is_small_folders)
+                columns["usable"].append(usable)
+                columns["unique"].append(unique)
+                columns["logical"].append(logical)
+                columns["parent"].append(parent)
+                columns["percent"].append(percent)
+        return columns
 
     @staticmethod
+    def _top_k_indices(
+        values: np.ndarray, candidates: np.ndarray, k: int
+    ) -> np.ndarray:
+        """Indices of the k largest values among candidates, largest first."""
+        if len(candidates) > k:
+            candidates = candidates[
+                np.argpartition(-values[candidates], k - 1)[:k]
+            ]
+        return candidates[np.argsort(-values[candidates], kind="stable")]
+
+    def _map_to_top_capacity_table_columns(
+        self, path: str, capacity_columns: Dict[str, list]
+    ) -> Dict[str, list]:
+        """
+        Map the capacity table columns of a top folder to the columns of the
+        top capacity table. Keeps the top 5 folders under the path and the
+        top 3 subfolders of each, ranked in report order. The path is
+        normalized the way VAST reports it, e.g. without a trailing slash.
+        """
+        root = posixpath.normpath(path)
+        paths = np.array(capacity_columns["path"], dtype=object)
+        parents = np.array(capacity_columns["parent"], dtype=object)
+        logical = np.array(capacity_columns["logical"], dtype=np.int64)
+        is_small_folders = np.array(
+            capacity_columns["is_small_folders"], dtype=bool
+        )
+        selected = []
+        top_indices = self._top_k_indices(
+            logical, np.flatnonzero((parents == root) & ~is_small_folders), 5
+        )
+        for top_index in top_indices:
+            selected.append((top_index, False))
+            sub_indices = self._top_k_indices(
+                logical, np.flatnonzero(parents == paths[top_index]), 3
+            )
+            for sub_index in sub_indices:
+                selected.append((sub_index, True))
+        report_datetime = self.job_settings.report_datetime
+        columns = {field: [] for field in TopCapacityTableRow.model_fields}
+        for rank, (index, is_subfolder) in enumerate(selected):
+            columns["report_datetime"].append(report_datetime)
+            columns["root"].append(root)
+            columns["path"].append(paths[index])
+            columns["is_subfolder"].append(is_subfolder)
+            columns["logical"].append(int(logical[index]))
+            columns["rank"].append(rank)
+        return columns
+
+    def _map_columns_to_dataframe(
+        self, columns: Dict[str, list], row_model: Type[BaseModel]
+    ) -> pd.DataFrame:
+        """
+        Map table columns to pandas DataFrame, with column order and dtypes
+        taken from the table row model. Adds rows for year and date to
+        partition data.
+        """
+        # Numeric and boolean columns get their dtype from the schema, so
+        # pandas does not need to infer it.
+        dtypes = {int: "int64", float: "float64", bool: "bool"}
+        df = pd.DataFrame(
+            {
+                name: pd.Series(
+                    columns[name], dtype=dtypes.get(field.annotation)
+                )
+                for name, field in row_model.model_fields.items()
+            }
+        )
+        # Every row shares the job's report datetime, so the partition
+        # columns are filled from one value instead of per row.
+        report_datetime = self.job_settings.report_datetime
+        df["report_date"] = pd.Series(
+            report_datetime.date().isoformat(),
+            index=df.index,
+            dtype="category",
+        )
+        df["report_year"] = report_datetime.year
+        return df
+
     def _map_rows_to_dataframe(
+        self,
         rows: List[CapacityTableRow] | List[QuotaTableRow],
     ) -> pd.DataFrame:
         """
         Map list of pydantic models to pandas DataFrame. Adds rows for year
         and date to partition data.
         """
-        df = pd.DataFrame([row.model_dump() for row in rows])
-        df["report_date"] = df["report_datetime"].dt.date
-        df["report_year"] = df["report_datetime"].dt.year
-        return df
+        # The table rows are flat, so read the field values directly instead
+        # of serializing each model, and hand pandas the data column-wise.
+        row_model = type(rows[0])
+        columns = {field: [] for field in row_model.model_fields}
+        for row in rows:
+            row_dict = row.__dict__
+            for field, values in columns.items():
+                values.append(row_dict[field])
+        return self._map_columns_to_dataframe(columns, row_model)
 
     def _write_report(self, df: pd.DataFrame, report_name: str) -> None:
         """Write report to file."""
@@ -169,13 +319,30 @@ class CompileMetricsJob:
             output_location = (
                 f"{self.job_settings.output_location}/{report_name}"
             )
-            wr.s3.to_parquet(
-                df=df,
-                path=output_location,
-                dataset=True,
-                partition_cols=["report_year", "report_date"],
-                mode="overwrite_partitions",
+            # awswrangler passes its own botocore config to every client it
+            # creates, so the connection pool size has to be set through it.
+            # Only the pool size is changed, and only for this write.
+            previous_config = wr.config.botocore_config
+            base_config = (
+                previous_config or wr._utils.default_botocore_config()
             )
+            wr.config.botocore_config = base_config.merge(
+                Config(
+                    max_pool_connections=self.job_settings.s3_max_concurrency
+                )
+            )
+            try:
+                wr.s3.to_parquet(
+                    df=df,
+                    path=output_location,
+                    dataset=True,
+                    partition_cols=["report_year", "report_date"],
+                    mode="overwrite_partitions",
+                    max_rows_by_file=self.job_settings.s3_max_rows_by_file,
+                    use_threads=self.job_settings.s3_max_concurrency,
+                )
+            finally:
+                wr.config.botocore_config = previous_config
         else:
             output_location = (
                 f"{self.job_settings.output_location}/{report_name}.csv"
@@ -185,20 +352,56 @@ class CompileMetricsJob:
     def run_job(self):
         """Compile the metrics and generate a report."""
 
-        all_capacity_rows = []
+        paths = self.job_settings.paths
+        # The VAST requests are network bound, so fetch them concurrently and
+        # gather the responses by path to keep the report order stable.
+        responses = dict()
+        with ThreadPoolExecutor(
+            max_workers=min(32, 2 * len(paths))
+        ) as executor:
+            futures = dict()
+            for path in paths:
+                futures[executor.submit(self._get_capacity, path=path)] = (
+                    path,
+                    "capacity",
+                )
+                futures[executor.submit(self._get_quota, path=path)] = (
+                    path,
+                    "quota",
+                )
+            for future in as_completed(futures):
+                responses[futures[future]] = future.result()
+        all_capacity_columns = {
+            field: [] for field in CapacityTableRow.model_fields
+        }
+        all_top_capacity_columns = {
+            field: [] for field in TopCapacityTableRow.model_fields
+        }
         all_quotas = []
-        for path in self.job_settings.paths:
-            capacity = self._get_capacity(path=path)
-            capacity_rows = self._map_to_capacity_table_rows(
-                capacity_info=capacity,
+        for path in paths:
+            capacity_columns = self._map_to_capacity_table_columns(
+                capacity_info=responses[(path, "capacity")],
+            )
+            for field, values in capacity_columns.items():
+                all_capacity_columns[field].extend(values)
+            # Summarize the largest folders now so the notification job does
+            # not have to read and rank the full capacity table.
+            top_capacity_columns = self._map_to_top_capacity_table_columns(
+                path=path, capacity_columns=capacity_columns
             )
-            all_capacity_rows.extend(capacity_rows)
-            quota = self._get_quota(path=path)
-            all_quotas.append(quota)
+            for field, values in top_capacity_columns.items():
+                all_top_capacity_columns[field].extend(values)
+            all_quotas.append(responses[(path, "quota")])
         all_quota_rows = self._map_to_quota_table_rows(all_quotas)
-        capacity_df = self._map_rows_to_dataframe(all_capacity_rows)
+        capacity_df = self._map_columns_to_dataframe(
+            all_capacity_columns, CapacityTableRow
+        )
+        top_capacity_df = self._map_columns_to_dataframe(
+            all_top_capacity_columns, TopCapacityTableRow
+        )
         quota_df = self._map_rows_to_dataframe(all_quota_rows)
         self._write_report(capacity_df, "capacity")
+        self._write_report(top_capacity_df, "capacity_top")
         self._write_report(quota_df, "quota")
 
 
@@ -116,3 +116,14 @@ class QuotaTableRow(BaseModel):
     soft_limit: int
     hard_limit: int
     percent_capacity: int
+
+
+class TopCapacityTableRow(BaseModel):
+    """Table row used to report the largest folders under a top folder."""
+
+    report_datetime: datetime
+    root: str
+    path: str
+    is_subfolder: bool
+    logical: int
+    rank: int
@@ -1,22 +1,50 @@
 """Module to send VAST notification"""
 
+import hashlib
 import logging
 import sys
-from datetime import UTC, date, datetime
+import tempfile
+import time
+from datetime import UTC, date, datetime, timedelta
 from pathlib import Path
 from typing import List, Optional, Tuple
 
-import awswrangler as wr
+import numpy as np
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import requests
 from aind_settings_utils.aws import SecretsManagerBaseSettings
-from jinja2 import Template
+from jinja2 import Environment
 from pandas import DataFrame
 from pydantic import Field
 from pydantic_settings import SettingsConfigDict
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 logging.basicConfig(level=logging.INFO)
 
+# The template is static, so compile it once when the module is loaded.
+NOTIFICATION_TEMPLATE = Environment(autoescape=False).from_string("""
+<div><p>We have reached a limit for data storage on VAST</p></div>
+<hr style="border-top: dashed 2px;">
+<div>
+{{ quotas_table | safe }}
+</div>
+{% for row in cap_tables %}
+<div>
+<p> Stats for: <b> {{ row[0] }} </b> </p>
+{{ row[1] | safe }}
+</div>
+{% endfor %}
+<div>
+<p>
+<br><b>DISCLAIMER:</b>
+<br>These are numbers estimated by VAST using statistical sampling.
+</p>
+</div>
+""")
+
 
 class JobSettings(
     SecretsManagerBaseSettings,
@@ -40,10 +68,24 @@ class JobSettings(
         description="Endpoint to send the alert to.",
     )
     report_date: Optional[date] = Field(
-        default_factory=lambda: datetime.now(UTC).date,
+        default_factory=lambda: datetime.now(UTC).date(),
         title="Report Date",
         description="Date of the reported data.",
     )
+    cache_dir: Optional[str] = Field(
+        default=None,
+        title="Cache Directory",
+        description=(
+            "Local directory to cache tables read from S3 in. Caching is "
+            "disabled if None. A cached table is not refreshed if the report "
+            "is rewritten before the cache TTL expires."
+        ),
+    )
+    cache_ttl: timedelta = Field(
+        default=timedelta(hours=24),
+        title="Cache TTL",
+        description="How long a cached table is reused for.",
+    )
 
 
 class SendNotificationJob:
@@ -54,36 +96,122 @@ class SendNotificationJob:
     def __init__(self, job_settings: JobSettings):
         """Class constructor."""
         self.job_settings = job_settings
+        # POST is not retried by default. Only statuses that mean the alert
+        # was not processed are retried, so a retry never sends a duplicate.
+        # Responses are returned after the last retry so raise_for_status
+        # reports the final status code.
+        retry = Retry(
+            total=5,
+            backoff_factor=0.3,
+            status_forcelist=[429, 503],
+            allowed_methods=["POST"],
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(max_retries=retry))
+        self.session.mount("http://", HTTPAdapter(max_retries=retry))
 
-    def _get_table(self, table_name: str) -> pd.DataFrame:
-        """Get a table from either local directory or S3."""
+    def _get_cache_path(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        roots: Optional[List[str]] = None,
+    ) -> Optional[Path]:
+        """Local path to cache a table in. None if caching is disabled."""
+        if self.job_settings.cache_dir is None:
+            return None
+        read_key = hashlib.sha256(
+            repr(
+                (
+                    self.job_settings.tables_location,
+                    columns,
+                    None if roots is None else sorted(roots),
+                )
+            ).encode()
+        ).hexdigest()[:16]
+        return (
+            Path(self.job_settings.cache_dir)
+            / f"{read_key}_{table_name}_{self.job_settings.report_date}"
+            f".feather"
+        )
+
+    def _read_s3_table(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        roots: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Read the partition of an S3 table for the report date. Raises a
+        FileNotFoundError if the partition has not been written.
+        """
+        report_date = self.job_settings.report_date
+        # Open the report date partition directly, so historical partitions
+        # are not listed and a missing partition is not read as empty.
+        path = (
+            f"{self.job_settings.tables_location}/{table_name}"
+            f"/report_year={report_date.year}/report_date={report_date}"
+        )
+        dataset = ds.dataset(path, format="parquet")
+        if not dataset.files:
+            raise FileNotFoundError(f"No files found in {path}")
+        row_filter = None
+        if roots is not None:
+            row_filter = pc.field("root").isin(roots)
+        return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+
+    def _get_table(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        roots: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Get a table from either local directory or S3. Optionally only reads
+        the given columns and the rows with one of the given roots. Tables
+        read from S3 are cached locally until the cache TTL
+        expires.
+        """
         if self.job_settings.tables_location.startswith("s3://"):
-            path = f"{self.job_settings.tables_location}/{table_name}"
-            report_date = self.job_settings.report_date
-            report_year = report_date.year
-            # my_filter = lambda x: x["report_year"] == str(report_year) and x[
-            #     "report_date"
-            # ] == str(report_date)
-            df = wr.s3.read_parquet(
-                path,
-                dataset=True,
-                partition_filter=lambda x: x["report_year"] == str(report_year)
-                and x["report_date"] == str(report_date),
-            )
+            cache_path = self._get_cache_path(table_name, columns, roots)
+            if (
+                cache_path is not None
+                and cache_path.exists()
+                and time.time() - cache_path.stat().st_mtime
+                < self.job_settings.cache_ttl.total_seconds()
+            ):
+                return pd.read_feather(cache_path)
+            df = self._read_s3_table(table_name, columns, roots)
+            if cache_path is not None:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Write to a temporary file first so a partial write is never
+                # picked up as a cache hit.
+                tmp_file = tempfile.NamedTemporaryFile(
+                    dir=cache_path.parent, suffix=".tmp", delete=False
+                )
+                try:
+                    with tmp_file:
+                        df.to_feather(tmp_file)
+                    Path(tmp_file.name).replace(cache_path)
+                except Exception:
+                    Path(tmp_file.name).unlink(missing_ok=True)
+                    raise
         else:
             path = (
                 Path(self.job_settings.tables_location) / f"{table_name}.csv"
             )
-            df = pd.read_csv(path)
+            df = pd.read_csv(path, usecols=columns)
+            if roots is not None:
+                df = df[df["root"].isin(roots)]
         return df
 
     @staticmethod
     def _format_quota_table(quota_df: DataFrame) -> DataFrame:
         """Reformat the quota table"""
-        problem_quota_df = quota_df[
-            quota_df["state"].str.upper() != "OK"
-        ].copy()
-        problem_quota_df = problem_quota_df[
+        # States are upper-cased when the quota table is compiled, but older
+        # or hand written tables may use other cases.
+        problem_quota_df = quota_df.loc[
+            ~quota_df["state"].isin(["OK", "Ok", "ok"]),
             [
                 "path",
                 "state",
@@ -91,17 +219,15 @@ class SendNotificationJob:
                 "soft_limit",
                 "hard_limit",
                 "percent_capacity",
-            ]
+            ],
         ]
-        problem_quota_df["soft_tb"] = problem_quota_df["soft_limit"] / (
-            1024**4
+        scale = 1.0 / (1024**4)
+        problem_quota_df[["soft_tb", "hard_tb", "used_capacity_tb"]] = (
+            problem_quota_df[
+                ["soft_limit", "hard_limit", "used_capacity"]
+            ].to_numpy(dtype=float)
+            * scale
         )
-        problem_quota_df["hard_tb"] = problem_quota_df["hard_limit"] / (
-            1024**4
-        )
-        problem_quota_df["used_capacity_tb"] = problem_quota_df[
-            "used_capacity"
-        ] / (1024**4)
         problem_quota_df.rename(
             columns={
                 "path": "Path",
@@ -127,37 +253,23 @@ class SendNotificationJob:
     @staticmethod
     def top_capacity_table(df: DataFrame, path: str) -> DataFrame:
         """
-        Filters the capacity table info to pull the top 5 folders and their
-        top 3 subfolders.
+        Filters the top capacity table info to pull the top 5 folders and
+        their top 3 subfolders.
         """
-        top_df = (
-            df[(df["parent"] == path) & (df["is_small_folders"].eq(False))]
-            .sort_values(by="logical", ascending=False)
-            .head(5)
-        )
-        top_df["sort_key"] = range(1, len(top_df) + 1)
-        top_df["sort_key2"] = 0
-        sort_key_map = pd.Series(
-            top_df["sort_key"].values, index=top_df["path"]
-        ).to_dict()
-        top_folder_names = top_df["path"]
-        sub_folders_df = df[df["parent"].isin(top_folder_names)].sort_values(
-            by="logical", ascending=False
-        )
-        sub_folders_df["path"] = "    " + df["path"].astype(str)
-        sub_folders_df["sort_key"] = sub_folders_df["parent"].map(sort_key_map)
-        sub_folders_df["sort_key2"] = range(1, len(sub_folders_df) + 1)
-        sub_folders_df = sub_folders_df.groupby("sort_key").head(3)
-        concat_df = pd.concat([top_df, sub_folders_df])
-        concat_df["logical_tb"] = concat_df["logical"] / (1024**4)
-        concat_df = concat_df.sort_values(
-            by=["sort_key", "sort_key2"], ascending=[True, True]
+        top_df = df[df["root"] == path].sort_values(by="rank")
+        indents = np.where(
+            top_df["is_subfolder"].to_numpy(dtype=bool), "    ", ""
         )
-        output_df = concat_df[["path", "logical_tb"]]
-        output_df = output_df.rename(
-            columns={"path": "Path", "logical_tb": "Logical TiB"}
+        return DataFrame(
+            {
+                "Path": [
+                    indent + str(folder)
+                    for indent, folder in zip(indents, top_df["path"])
+                ],
+                "Logical TiB": top_df["logical"].to_numpy(dtype=float)
+                / (1024**4),
+            }
         )
-        return output_df
 
     @staticmethod
     def _format_tables_as_html(
@@ -165,38 +277,16 @@ class SendNotificationJob:
     ):
         """Formats dfs to html"""
 
-        template_string = """
-        <div><p>We have reached a limit for data storage on VAST</p></div>
-        <hr style="border-top: dashed 2px;">
-        <div>
-        {{ quotas_table | safe }}
-        </div>
-        {% for row in cap_tables %}
-        <div>
-        <p> Stats for: <b> {{ row[0] }} </b> </p>
-        {{ row[1] | safe }}
-        </div>
-        {% endfor %}
-        <div>
-        <p>
-        <br><b>DISCLAIMER:</b>
-        <br>These are numbers estimated by VAST using statistical sampling.
-        </p>
-        </div>
-        """
-        template = Template(template_string)
-
-        return template.render(
+        return NOTIFICATION_TEMPLATE.render(
             quotas_table=problem_quotas, cap_tables=capacity_dfs
         )
 
     def send_notification(self, html_body: str):
         """Send a notification."""
-        webhook_response = requests.post(
+        webhook_response = self.session.post(
             self.job_settings.alert_url,
             json={"text": html_body},
             headers={"Content-Type": "application/json"},
-            verify=False,
         )
         webhook_response.raise_for_status()
 
@@ -207,7 +297,11 @@ class SendNotificationJob:
         problem_paths = problem_quota_df["Path"]
         if len(problem_paths) > 0:
             dfs_to_report = []
-            capacity_df = self._get_table("capacity")
+            capacity_df = self._get_table(
+                "capacity_top",
+                columns=["root", "path", "is_subfolder", "logical", "rank"],
+                roots=list(problem_paths),
+            )
             for problem_path in sorted(problem_paths):
                 dfs_to_report.append(
                     (
@@ -1 +1,5 @@
 """Testing library"""
+
+from pathlib import Path
+
+RESOURCES_DIR = (Path(__file__).parent / "resources").resolve()
@@ -3,17 +3,123 @@
 import json
 import os
 import unittest
-from datetime import date, datetime, timezone
-from pathlib import Path
+from contextlib import ExitStack
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
+import awswrangler as wr
+from botocore.config import Config
 from pydantic import SecretStr
-from pydantic_core import TzInfo
 
 from aind_vast_utils.compile_metrics_job import CompileMetricsJob, JobSettings
-from aind_vast_utils.models import Capacity, CapacityData, Quota
+from aind_vast_utils.models import (
+    Capacity,
+    CapacityData,
+    CapacityTableRow,
+    Quota,
+)
+from tests import RESOURCES_DIR
 
-RESOURCES_DIR = Path(os.path.dirname(os.path.realpath(__file__))) / "resources"
+with open(RESOURCES_DIR / "capacity_response.json", "r") as f:
+    CAPACITY_RESPONSE = json.load(f)
+
+with open(RESOURCES_DIR / "quotas_response.json", "r") as f:
+    QUOTAS_RESPONSE = json.load(f)
+
+
+# Expected model_dump() of the parsed responses. Comparing dumps avoids
+# validating a full expected model in each test.
+_EXPECTED_CAPACITY = {
+    "details": [
+        (
+            "/aind/scratch",
+            {
+                "data": [318535641364598, 276370399582092, 771249318149374],
+                "parent": "/aind",
+                "percent": 100.0,
+                "average_atime": datetime(2024, 12, 17, 9, 55),
+            },
+        ),
+        (
+            "/aind/scratch/ophys",
+            {
+                "data": [31436537147351, 26412466407190, 275667807998781],
+                "parent": "/aind/scratch",
+                "percent": 9.87,
+                "average_atime": datetime(2025, 2, 6, 23, 44),
+            },
+        ),
+    ],
+    "keys": ["usable", "unique", "logical"],
+    "time": datetime(2025, 11, 12, 18, 59),
+    "sort_key": "usable",
+    "root_data": [3128954951249558, 2689008553951633, 5441825959464217],
+    "small_folders": [
+        (
+            "/aind/scratch/abc",
+            {
+                "data": [5143983132, 5018378864, 15452267346],
+                "parent": "/aind/scratch",
+                "percent": 0.0,
+                "average_atime": datetime(2025, 5, 30, 17, 28),
+            },
+        ),
+        (
+            "/aind/scratch/def",
+            {
+                "data": [4139968368, 1272458632, 30855765913],
+                "parent": "/aind/scratch",
+                "percent": 0.0,
+                "average_atime": datetime(2024, 2, 3, 5, 43),
+            },
+        ),
+    ],
+}
+
+_EXPECTED_QUOTA = {
+    "id": 123,
+    "guid": "1a11a1aa-aa11-1a11-11a1-1aa11aaa11aa",
+    "name": "aind_scratch",
+    "url": "https://example.com/api/quotas/153",
+    "title": "aind_scratch",
+    "state": "SOFT_EXCEEDED",
+    "path": "/aind/scratch",
+    "grace_period": None,
+    "soft_limit": 747667906887680,
+    "hard_limit": 786150813859840,
+    "soft_limit_inodes": None,
+    "hard_limit_inodes": None,
+    "used_inodes": 87589553,
+    "sync_state": "SYNCHRONIZED",
+    "used_capacity": 775337561472891,
+    "used_effective_capacity": 775337561472891,
+    "used_capacity_tb": 705.165,
+    "pretty_state": "SOFT_EXCEEDED",
+    "used_effective_capacity_tb": 705.165,
+    "cluster": "VAST-CLUSTER",
+    "cluster_id": 1,
+    "tenant_id": 1,
+    "internal": False,
+    "pretty_grace_period": None,
+    "pretty_grace_period_expiration": None,
+    "time_to_block": None,
+    "default_user_quota": None,
+    "default_group_quota": None,
+    "system_id": 345,
+    "is_user_quota": False,
+    "num_exceeded_users": 0,
+    "num_blocked_users": 0,
+    "enable_alarms": True,
+    "default_email": "example@example.com",
+    "last_user_quotas_update": datetime(
+        2025, 9, 3, 18, 12, 21, 781741, tzinfo=timezone.utc
+    ),
+    "percent_inodes": None,
+    "percent_capacity": 98,
+    "enable_email_providers": True,
+    "used_limited_capacity": 775337561472891,
+    "tenant_name": "default",
+}
 
 
 class TestCompileMetricsJob(unittest.TestCase):
@@ -24,22 +130,14 @@ class TestCompileMetricsJob(unittest.TestCase):
     def setUpClass(cls):
         """Set up class with mocked responses and default test job."""
 
-        with open(RESOURCES_DIR / "capacity_response.json", "r") as f:
-            capacity_response = json.load(f)
-
-        with open(RESOURCES_DIR / "quotas_response.json", "r") as f:
-            quotas_response = json.load(f)
-
         cls.patch_vast_client = patch(
             "aind_vast_utils.compile_metrics_job.VASTClient"
         )
         cls.mock_vast_client = cls.patch_vast_client.start()
-        cls.mock_vast_client.return_value.capacity.get.return_value = (
-            capacity_response
-        )
-        cls.mock_vast_client.return_value.quotas.get.return_value = (
-            quotas_response
-        )
+        vast_client = MagicMock()
+        vast_client.capacity.get.return_value = CAPACITY_RESPONSE
+        vast_client.quotas.get.return_value = QUOTAS_RESPONSE
+        cls.mock_vast_client.return_value = vast_client
         job_settings = JobSettings(
             address="example.com",
             user="user",
@@ -51,6 +149,10 @@ class TestCompileMetricsJob(unittest.TestCase):
         )
         job = CompileMetricsJob(job_settings=job_settings)
         cls.job = job
+        cls.capacity_info = job._get_capacity(
+            path="/aind/scratch", sort_key="usable"
+        )
+        cls.quota_info = job._get_quota(path="/aind/scratch")
 
     @classmethod
     def tearDownClass(cls):
@@ -58,213 +160,225 @@ class TestCompileMetricsJob(unittest.TestCase):
         cls.patch_vast_client.stop()
 
     def test_get_capacity(self):
-        """Tests get_capacity method."""
+        """Tests get_capacity method when responses are validated."""
 
-        capacity = self.job._get_capacity(
-            path="/aind/scratch", sort_key="usable"
+        job_settings = self.job.job_settings.model_copy(
+            update={"validate_responses": True}
         )
-        expected_capacity = Capacity(
-            details=[
-                (
-                    "/aind/scratch",
-                    CapacityData(
-                        data=[
-                            318535641364598,
-                            276370399582092,
-                            771249318149374,
-                        ],
-                        parent="/aind",
-                        percent=100.0,
-                        average_atime=datetime(2024, 12, 17, 9, 55),
-                    ),
-                ),
-                (
-                    "/aind/scratch/ophys",
-                    CapacityData(
-                        data=[31436537147351, 26412466407190, 275667807998781],
-                        parent="/aind/scratch",
-                        percent=9.87,
-                        average_atime=datetime(2025, 2, 6, 23, 44),
-                    ),
-                ),
-            ],
-            keys=["usable", "unique", "logical"],
-            time=datetime(2025, 11, 12, 18, 59),
-            sort_key="usable",
-            root_data=[3128954951249558, 2689008553951633, 5441825959464217],
-            small_folders=[
-                (
-                    "/aind/scratch/abc",
-                    CapacityData(
-                        data=[5143983132, 5018378864, 15452267346],
-                        parent="/aind/scratch",
-                        percent=0.0,
-                        average_atime=datetime(2025, 5, 30, 17, 28),
-                    ),
-                ),
-                (
-                    "/aind/scratch/def",
-                    CapacityData(
-                        data=[4139968368, 1272458632, 30855765913],
-                        parent="/aind/scratch",
-                        percent=0.0,
-                        average_atime=datetime(2024, 2, 3, 5, 43),
-                    ),
-                ),
-            ],
+        new_job = CompileMetricsJob(job_settings=job_settings)
+        capacity = new_job._get_capacity(
+            path="/aind/scratch", sort_key="usable"
         )
-        self.assertEqual(expected_capacity, capacity)
+        self.assertIsInstance(capacity.details[0][1], CapacityData)
+        self.assertEqual(_EXPECTED_CAPACITY, capacity.model_dump())
+
+    def test_get_capacity_without_validation(self):
+        """Tests get_capacity method constructs trusted responses."""
+
+        capacity = self.capacity_info
+        self.assertIsInstance(capacity, Capacity)
+        self.assertEqual(["usable", "unique", "logical"], capacity.keys)
+        self.assertEqual("/aind/scratch/ophys", capacity.details[1][0])
+        self.assertIsInstance(capacity.details[1][1], CapacityData)
+        self.assertEqual("/aind/scratch", capacity.small_folders[0][1].parent)
 
     def test_get_quota(self):
-        """Tests _get_quota method."""
-
-        quota = self.job._get_quota(path="/aind/scratch")
-        expected_quota = Quota(
-            id=123,
-            guid="1a11a1aa-aa11-1a11-11a1-1aa11aaa11aa",
-            name="aind_scratch",
-            url="https://example.com/api/quotas/153",
-            title="aind_scratch",
-            state="SOFT_EXCEEDED",
-            path="/aind/scratch",
-            grace_period=None,
-            soft_limit=747667906887680,
-            hard_limit=786150813859840,
-            soft_limit_inodes=None,
-            hard_limit_inodes=None,
-            used_inodes=87589553,
-            sync_state="SYNCHRONIZED",
-            used_capacity=775337561472891,
-            used_effective_capacity=775337561472891,
-            used_capacity_tb=705.165,
-            pretty_state="SOFT_EXCEEDED",
-            used_effective_capacity_tb=705.165,
-            cluster="VAST-CLUSTER",
-            cluster_id=1,
-            tenant_id=1,
-            internal=False,
-            pretty_grace_period=None,
-            pretty_grace_period_expiration=None,
-            time_to_block=None,
-            default_user_quota=None,
-            default_group_quota=None,
-            system_id=345,
-            is_user_quota=False,
-            num_exceeded_users=0,
-            num_blocked_users=0,
-            enable_alarms=True,
-            default_email="example@example.com",
-            last_user_quotas_update=datetime(
-                2025, 9, 3, 18, 12, 21, 781741, tzinfo=TzInfo(0)
-            ),
-            percent_inodes=None,
-            percent_capacity=98,
-            enable_email_providers=True,
-            used_limited_capacity=775337561472891,
-            tenant_name="default",
+        """Tests _get_quota method when responses are validated."""
+
+        job_settings = self.job.job_settings.model_copy(
+            update={"validate_responses": True}
         )
-        self.assertEqual(expected_quota, quota)
+        new_job = CompileMetricsJob(job_settings=job_settings)
+        quota = new_job._get_quota(path="/aind/scratch")
+        self.assertIsInstance(quota, Quota)
+        self.assertEqual(_EXPECTED_QUOTA, quota.model_dump())
+
+    def test_expected_responses_match_models(self):
+        """Tests the expected responses still round trip through models."""
+
+        self.assertEqual(
+            _EXPECTED_CAPACITY,
+            Capacity.model_validate(_EXPECTED_CAPACITY).model_dump(),
+        )
+        self.assertEqual(
+            _EXPECTED_QUOTA, Quota.model_validate(_EXPECTED_QUOTA).model_dump()
+        )
+
+    def test_get_quota_without_validation(self):
+        """Tests _get_quota method constructs trusted responses."""
+
+        quota = self.quota_info
+        self.assertIsInstance(quota, Quota)
+        self.assertEqual("SOFT_EXCEEDED", quota.state)
+        self.assertEqual(98, quota.percent_capacity)
 
-    def test_map_to_capacity_table_rows(self):
-        """Tests _map_to_capacity_table_rows method."""
+    def test_map_to_capacity_table_columns(self):
+        """Tests _map_to_capacity_table_columns method."""
 
-        path = "/aind/scratch"
-        capacity_info = self.job._get_capacity(path=path, sort_key="usable")
-        rows = self.job._map_to_capacity_table_rows(
-            capacity_info=capacity_info,
+        columns = self.job._map_to_capacity_table_columns(
+            capacity_info=self.capacity_info,
         )
-        self.assertEqual(4, len(rows))
-        self.assertEqual("/aind/scratch/ophys", rows[1].path)
+        self.assertEqual(4, len(columns["path"]))
+        self.assertEqual("/aind/scratch/ophys", columns["path"][1])
+        self.assertEqual(
+            [False, False, True, True], columns["is_small_folders"]
+        )
+        self.assertEqual("/aind/scratch/def", columns["path"][2])
 
     def test_map_to_quota_table_rows(self):
         """Tests _map_to_quota_table_rows method."""
 
-        path = "/aind/scratch"
-        quota_info = self.job._get_quota(path=path)
-        rows = self.job._map_to_quota_table_rows(quotas=[quota_info])
+        rows = self.job._map_to_quota_table_rows(
+            quotas=[
+                self.quota_info,
+                self.quota_info.model_copy(update={"state": "ok"}),
+            ]
+        )
         self.assertEqual(98, rows[0].percent_capacity)
+        self.assertEqual("SOFT_EXCEEDED", rows[0].state)
+        self.assertEqual("OK", rows[1].state)
+
+    def test_map_to_top_capacity_table_columns(self):
+        """Tests _map_to_top_capacity_table_columns method."""
+        top_folders = [f"/r/{i}" for i in range(7)]
+        sub_folders = [f"/r/0/{i}" for i in range(4)]
+        capacity_columns = {
+            "path": top_folders + sub_folders,
+            "parent": ["/r"] * 7 + ["/r/0"] * 4,
+            "is_small_folders": [False] * 6 + [True] + [False] * 4,
+            "logical": [10, 2, 5, 1, 4, 3, 20, 1, 4, 2, 3],
+        }
+        columns = self.job._map_to_top_capacity_table_columns(
+            path="/r", capacity_columns=capacity_columns
+        )
+        self.assertEqual(
+            [
+                "/r/0",
+                "/r/0/1",
+                "/r/0/3",
+                "/r/0/2",
+                "/r/2",
+                "/r/4",
+                "/r/5",
+                "/r/1",
+            ],
+            columns["path"],
+        )
+        self.assertEqual(
+            [False, True, True, True, False, False, False, False],
+            columns["is_subfolder"],
+        )
+        self.assertEqual([10, 4, 3, 2, 5, 4, 3, 2], columns["logical"])
+        self.assertEqual(list(range(8)), columns["rank"])
+        self.assertEqual(["/r"] * 8, columns["root"])
+        self.assertEqual(
+            columns,
+            self.job._map_to_top_capacity_table_columns(
+                path="/r/", capacity_columns=capacity_columns
+            ),
+        )
+
+    def test_map_columns_to_dataframe(self):
+        """Tests _map_columns_to_dataframe method"""
+        columns = self.job._map_to_capacity_table_columns(
+            capacity_info=self.capacity_info,
+        )
+        df = self.job._map_columns_to_dataframe(
+            columns=columns, row_model=CapacityTableRow
+        )
+        self.assertEqual(4, len(df))
+        self.assertEqual(2025, df.loc[0, "report_year"])
+        self.assertEqual("2025-11-12", df.loc[0, "report_date"])
+        self.assertEqual("category", df["report_date"].dtype)
+        self.assertEqual("int64", df["logical"].dtype)
+        self.assertEqual("bool", df["is_small_folders"].dtype)
 
     def test_map_rows_to_dataframe(self):
         """Tests _map_rows_to_dataframe method"""
-        path = "/aind/scratch"
-        capacity_info = self.job._get_capacity(path=path, sort_key="usable")
-        rows = self.job._map_to_capacity_table_rows(
-            capacity_info=capacity_info,
-        )
+        rows = self.job._map_to_quota_table_rows(quotas=[self.quota_info])
         df = self.job._map_rows_to_dataframe(rows=rows)
+        self.assertEqual(98, df.loc[0, "percent_capacity"])
         self.assertEqual(2025, df.loc[0, "report_year"])
-        self.assertEqual(date(2025, 11, 12), df.loc[0, "report_date"])
-
-    @patch("pandas.DataFrame.to_csv")
-    @patch("awswrangler.s3.to_parquet")
-    @patch("builtins.print")
-    def test_write_report_print(
-        self,
-        mock_print: MagicMock,
-        mock_awswrangler_s3_to_parquet: MagicMock,
-        mock_pandas_df_to_csv: MagicMock,
-    ):
-        """Tests write report function when no output location set."""
-        path = "/aind/scratch"
-        capacity_info = self.job._get_capacity(path=path, sort_key="usable")
-        rows = self.job._map_to_capacity_table_rows(
-            capacity_info=capacity_info,
-        )
-        df = self.job._map_rows_to_dataframe(rows=rows)
-        self.job._write_report(df=df, report_name="capacity")
-        mock_pandas_df_to_csv.assert_not_called()
-        mock_awswrangler_s3_to_parquet.assert_not_called()
-        mock_print.assert_called()
-
-    @patch("pandas.DataFrame.to_csv")
-    @patch("awswrangler.s3.to_parquet")
-    @patch("builtins.print")
-    def test_write_report_csv(
-        self,
-        mock_print: MagicMock,
-        mock_awswrangler_s3_to_parquet: MagicMock,
-        mock_pandas_df_to_csv: MagicMock,
-    ):
-        """Tests write report function when local output location set."""
-        job_settings = self.job.job_settings.model_copy(
-            deep=True, update={"output_location": "."}
+        self.assertEqual("2025-11-12", df.loc[0, "report_date"])
+        self.assertEqual("category", df["report_date"].dtype)
+        self.assertEqual("int64", df["percent_capacity"].dtype)
+
+    def test_write_report(self):
+        """Tests write report function for each output location."""
+        columns = self.job._map_to_capacity_table_columns(
+            capacity_info=self.capacity_info,
         )
-        new_job = CompileMetricsJob(job_settings=job_settings)
-        path = "/aind/scratch"
-        capacity_info = new_job._get_capacity(path=path, sort_key="usable")
-        rows = new_job._map_to_capacity_table_rows(
-            capacity_info=capacity_info,
+        df = self.job._map_columns_to_dataframe(
+            columns=columns, row_model=CapacityTableRow
         )
-        df = new_job._map_rows_to_dataframe(rows=rows)
-        new_job._write_report(df=df, report_name="capacity")
-        mock_pandas_df_to_csv.assert_called()
-        mock_awswrangler_s3_to_parquet.assert_not_called()
-        mock_print.assert_not_called()
-
-    @patch("pandas.DataFrame.to_csv")
-    @patch("awswrangler.s3.to_parquet")
-    @patch("builtins.print")
-    def test_write_report_s3(
-        self,
-        mock_print: MagicMock,
-        mock_awswrangler_s3_to_parquet: MagicMock,
-        mock_pandas_df_to_csv: MagicMock,
-    ):
-        """Tests write report function when s3 output location set."""
+        cases = [
+            (None, False, False, True),
+            (".", True, False, False),
+            ("s3://example/path", False, True, False),
+        ]
+        with ExitStack() as stack:
+            mock_to_csv = stack.enter_context(patch("pandas.DataFrame.to_csv"))
+            mock_to_parquet = stack.enter_context(
+                patch("awswrangler.s3.to_parquet")
+            )
+            mock_print = stack.enter_context(patch("builtins.print"))
+            for output_location, expect_csv, expect_s3, expect_print in cases:
+                with self.subTest(output_location=output_location):
+                    for mock in [mock_to_csv, mock_to_parquet, mock_print]:
+                        mock.reset_mock()
+                    job_settings = self.job.job_settings.model_copy(
+                        update={"output_location": output_location}
+                    )
+                    new_job = CompileMetricsJob(job_settings=job_settings)
+                    new_job._write_report(df=df, report_name="capacity")
+                    self.assertEqual(expect_csv, mock_to_csv.called)
+                    self.assertEqual(expect_s3, mock_to_parquet.called)
+                    self.assertEqual(expect_print, mock_print.called)
+            _, kwargs = mock_to_parquet.call_args
+        self.assertEqual("s3://example/path/capacity", kwargs["path"])
+        self.assertEqual(64, kwargs["use_threads"])
+        self.assertEqual(250_000, kwargs["max_rows_by_file"])
+
+    def _write_s3_report(self) -> Config:
+        """Write a report to S3 and return the botocore config it used."""
         job_settings = self.job.job_settings.model_copy(
-            deep=True, update={"output_location": "s3://example/path"}
+            update={"output_location": "s3://example/path"}
         )
         new_job = CompileMetricsJob(job_settings=job_settings)
-        path = "/aind/scratch"
-        capacity_info = new_job._get_capacity(path=path, sort_key="usable")
-        rows = new_job._map_to_capacity_table_rows(
-            capacity_info=capacity_info,
+        used_configs = []
+        with patch(
+            "awswrangler.s3.to_parquet",
+            side_effect=lambda **_: used_configs.append(
+                wr.config.botocore_config
+            ),
+        ):
+            new_job._write_report(df=MagicMock(), report_name="capacity")
+        return used_configs[0]
+
+    @patch.dict(
+        os.environ, {"AWS_MAX_ATTEMPTS": "3", "AWS_RETRY_MODE": "adaptive"}
+    )
+    def test_write_report_botocore_config(self):
+        """Tests the S3 write only changes the connection pool size."""
+        botocore_config = self._write_s3_report()
+        self.assertEqual(
+            {"max_attempts": 3, "mode": "adaptive"}, botocore_config.retries
+        )
+        self.assertEqual(64, botocore_config.max_pool_connections)
+        self.assertEqual(
+            f"awswrangler/{wr.__version__}", botocore_config.user_agent_extra
         )
-        df = new_job._map_rows_to_dataframe(rows=rows)
-        new_job._write_report(df=df, report_name="capacity")
-        mock_pandas_df_to_csv.assert_not_called()
-        mock_awswrangler_s3_to_parquet.assert_called()
-        mock_print.assert_not_called()
+        self.assertIsNone(wr.config.botocore_config)
+
+    def test_write_report_keeps_caller_botocore_config(self):
+        """Tests the S3 write builds on and restores the caller's config."""
+        caller_config = Config(connect_timeout=30)
+        wr.config.botocore_config = caller_config
+        self.addCleanup(wr.config.reset, "botocore_config")
+        botocore_config = self._write_s3_report()
+        self.assertEqual(30, botocore_config.connect_timeout)
+        self.assertEqual(64, botocore_config.max_pool_connections)
+        self.assertIs(caller_config, wr.config.botocore_config)
 
     @patch(
         "aind_vast_utils.compile_metrics_job.CompileMetricsJob._write_report"
@@ -273,7 +387,68 @@ class TestCompileMetricsJob(unittest.TestCase):
         """Tests run job method."""
 
         self.job.run_job()
-        mock_write_report.assert_called()
+        self.assertEqual(
+            ["capacity", "capacity_top", "quota"],
+            [c.args[1] for c in mock_write_report.call_args_list],
+        )
+
+    @patch(
+        "aind_vast_utils.compile_metrics_job.CompileMetricsJob._write_report"
+    )
+    def test_run_job_with_trailing_slash(self, mock_write_report: MagicMock):
+        """Tests top capacity roots match quota paths for any path style."""
+
+        job_settings = self.job.job_settings.model_copy(
+            update={"paths": ["/aind/scratch/"]}
+        )
+        CompileMetricsJob(job_settings=job_settings).run_job()
+        reports = {
+            c.args[1]: c.args[0] for c in mock_write_report.call_args_list
+        }
+        top_capacity_df = reports["capacity_top"]
+        self.assertEqual(
+            ["/aind/scratch/ophys"], list(top_capacity_df["path"])
+        )
+        self.assertEqual(
+            list(reports["quota"]["path"]),
+            list(top_capacity_df["root"].unique()),
+        )
+
+
+class TestJobSettings(unittest.TestCase):
+    """Tests JobSettings class."""
+
+    def test_model_construction(self):
+        """Tests settings built directly from keyword arguments."""
+        job_settings = JobSettings(
+            address="example.com",
+            user="user",
+            password=SecretStr("password"),
+            paths=["/aind/scratch"],
+        )
+        self.assertEqual("example.com", job_settings.address)
+        self.assertEqual("password", job_settings.password.get_secret_value())
+        self.assertEqual(["/aind/scratch"], job_settings.paths)
+        self.assertIsNone(job_settings.output_location)
+
+    @patch.dict(
+        os.environ,
+        {
+            "VAST_ADDRESS": "example.com",
+            "VAST_USER": "user",
+            "VAST_PASSWORD": "password",
+            "VAST_PATHS": '["/aind/scratch"]',
+        },
+        clear=True,
+    )
+    def test_model_construction_from_env(self):
+        """Tests settings loaded from environment variables."""
+        # noinspection PyArgumentList
+        job_settings = JobSettings()
+        self.assertEqual("example.com", job_settings.address)
+        self.assertEqual("password", job_settings.password.get_secret_value())
+        self.assertEqual(["/aind/scratch"], job_settings.paths)
+        self.assertIsNone(job_settings.output_location)
 
 
 if __name__ == "__main__":
@@ -1,20 +1,25 @@
 """Tests send_notification_job module."""
 
 import os
+import time
 import unittest
 from datetime import date
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from requests import Response
 
 from aind_vast_utils.send_notification_job import (
     JobSettings,
     SendNotificationJob,
 )
-
-RESOURCES_DIR = Path(os.path.dirname(os.path.realpath(__file__))) / "resources"
+from tests import RESOURCES_DIR
 
 
 class TestSendNotificationJob(unittest.TestCase):
@@ -28,71 +33,240 @@ class TestSendNotificationJob(unittest.TestCase):
         job_settings = JobSettings(
             tables_location=str(RESOURCES_DIR),
             alert_url="www.example.com/alert",
-            report_date=date.fromisoformat("2025-11-12"),
+            report_date=date(2025, 11, 12),
         )
         job_settings2 = JobSettings(
             tables_location=str(RESOURCES_DIR / "example_csvs"),
             alert_url="www.example.com/alert",
-            report_date=date.fromisoformat("2025-11-12"),
+            report_date=date(2025, 11, 12),
         )
         cls.job = SendNotificationJob(job_settings=job_settings)
         cls.other_job = SendNotificationJob(job_settings=job_settings2)
+        cls.capacity_top_df = cls.job._get_table(table_name="capacity_top")
+        cls.quota_df = cls.job._get_table(table_name="quota")
+        # Kept so a test can read a real local dataset through the mock
+        cls.dataset = staticmethod(ds.dataset)
+        patch_dataset = patch("pyarrow.dataset.dataset")
+        cls.mock_dataset = patch_dataset.start()
+        cls.addClassCleanup(patch_dataset.stop)
+        patch_post = patch("requests.Session.post")
+        cls.mock_post = patch_post.start()
+        cls.addClassCleanup(patch_post.stop)
+
+    def setUp(self):
+        """Reset the class level mocks before each test."""
+        self.mock_dataset.reset_mock(return_value=True, side_effect=True)
+        self.mock_post.reset_mock(return_value=True)
 
-    @patch("awswrangler.s3.read_parquet")
-    def test_get_table(self, mock_wrangler: MagicMock):
+    def test_get_table(self):
         """Tests _get_table method."""
 
         table = self.job._get_table(table_name="quota")
         self.assertIsInstance(table, pd.DataFrame)
-        mock_wrangler.assert_not_called()
+        self.mock_dataset.assert_not_called()
 
-    @patch("awswrangler.s3.read_parquet")
-    def test_get_table_from_s3(self, mock_wrangler: MagicMock):
+    def test_get_table_from_s3(self):
         """Tests _get_table method when tables_location set to S3."""
         new_job_settings = self.job.job_settings.model_copy(
-            deep=True, update={"tables_location": "s3://example/tables"}
+            update={"tables_location": "s3://example/tables"}
         )
         new_job = SendNotificationJob(job_settings=new_job_settings)
         new_job._get_table(table_name="quota")
-        mock_wrangler.assert_called_once()
+        self.mock_dataset.assert_called_once()
+        self.assertEqual(
+            "s3://example/tables/quota/report_year=2025"
+            "/report_date=2025-11-12",
+            self.mock_dataset.call_args.args[0],
+        )
+        _, kwargs = self.mock_dataset.return_value.to_table.call_args
+        self.assertIsNone(kwargs["filter"])
+
+    def test_get_table_from_s3_with_filters(self):
+        """Tests _get_table method pushes column and root filters to S3."""
+        new_job_settings = self.job.job_settings.model_copy(
+            update={"tables_location": "s3://example/tables"}
+        )
+        new_job = SendNotificationJob(job_settings=new_job_settings)
+        new_job._get_table(
+            table_name="capacity_top",
+            columns=["path", "logical"],
+            roots=["/"],
+        )
+        _, kwargs = self.mock_dataset.return_value.to_table.call_args
+        self.assertEqual(["path", "logical"], kwargs["columns"])
+        expected_filter = pc.field("root").isin(["/"])
+        self.assertTrue(expected_filter.equals(kwargs["filter"]))
+
+    def test_read_s3_table_missing_partition(self):
+        """Tests _read_s3_table raises if the report date was not written."""
+        self.mock_dataset.side_effect = self.dataset
+        with TemporaryDirectory() as tables_location:
+            old_partition = (
+                Path(tables_location)
+                / "quota"
+                / "report_year=2025"
+                / "report_date=2025-11-11"
+            )
+            old_partition.mkdir(parents=True)
+            pq.write_table(
+                pa.Table.from_pandas(self.quota_df),
+                old_partition / "part.parquet",
+            )
+            new_job_settings = self.job.job_settings.model_copy(
+                update={"tables_location": tables_location}
+            )
+            new_job = SendNotificationJob(job_settings=new_job_settings)
+            with self.assertRaises(FileNotFoundError):
+                new_job._read_s3_table(table_name="quota")
+            (old_partition.parent / "report_date=2025-11-12").mkdir()
+            with self.assertRaises(FileNotFoundError):
+                new_job._read_s3_table(table_name="quota")
+
+    def test_get_table_with_filters(self):
+        """Tests _get_table method filters local tables."""
+        table = self.job._get_table(
+            table_name="capacity_top",
+            columns=["root", "path", "logical"],
+            roots=["/aind/scratch"],
+        )
+        self.assertEqual(["root", "path", "logical"], list(table.columns))
+        self.assertEqual(1, len(table))
+        empty_table = self.job._get_table(
+            table_name="capacity_top", roots=["/aind/stage"]
+        )
+        self.assertEqual(0, len(empty_table))
+
+    def test_get_table_from_s3_cache(self):
+        """Tests _get_table method caches tables read from S3."""
+        mock_table = self.mock_dataset.return_value.to_table.return_value
+        mock_table.to_pandas.return_value = self.quota_df
+        with TemporaryDirectory() as cache_dir:
+            new_job_settings = self.job.job_settings.model_copy(
+                update={
+                    "tables_location": "s3://example/tables",
+                    "cache_dir": cache_dir,
+                }
+            )
+            new_job = SendNotificationJob(job_settings=new_job_settings)
+            first_table = new_job._get_table(table_name="quota")
+            second_table = new_job._get_table(table_name="quota")
+            self.assertEqual(1, self.mock_dataset.call_count)
+            pd.testing.assert_frame_equal(first_table, second_table)
+            cache_path = new_job._get_cache_path(table_name="quota")
+            self.assertEqual([cache_path.name], os.listdir(cache_dir))
+            expired = time.time() - 2 * 24 * 60 * 60
+            os.utime(cache_path, (expired, expired))
+            new_job._get_table(table_name="quota")
+            self.assertEqual(2, self.mock_dataset.call_count)
+
+    def test_get_table_from_s3_cache_write_error(self):
+        """Tests _get_table removes the temporary file if caching fails."""
+        mock_table = self.mock_dataset.return_value.to_table.return_value
+        mock_table.to_pandas.return_value = self.quota_df
+        with TemporaryDirectory() as cache_dir:
+            new_job_settings = self.job.job_settings.model_copy(
+                update={
+                    "tables_location": "s3://example/tables",
+                    "cache_dir": cache_dir,
+                }
+            )
+            new_job = SendNotificationJob(job_settings=new_job_settings)
+            with (
+                patch("pandas.DataFrame.to_feather", side_effect=OSError),
+                self.assertRaises(OSError),
+            ):
+                new_job._get_table(table_name="quota")
+            self.assertEqual([], os.listdir(cache_dir))
+
+    def test_format_quota_table(self):
+        """Tests _format_quota_table method"""
+        quota_df = pd.DataFrame(
+            {
+                "path": ["/aind/scratch", "/aind/stage", "/aind/other"],
+                "state": ["SOFT_EXCEEDED", "OK", "ok"],
+                "used_capacity": [3 * 1024**4, 1024**4, 1024**4],
+                "soft_limit": [2 * 1024**4] * 3,
+                "hard_limit": [4 * 1024**4] * 3,
+                "percent_capacity": [75, 25, 25],
+            }
+        )
+        df = self.job._format_quota_table(quota_df)
+        self.assertEqual(["/aind/scratch"], list(df["Path"]))
+        self.assertEqual(
+            [3.0, 2.0, 4.0],
+            df[
+                [
+                    "Used Capacity (TiB)",
+                    "Soft Limit (TiB)",
+                    "Hard Limit (TiB)",
+                ]
+            ]
+            .iloc[0]
+            .tolist(),
+        )
 
     def test_top_capacity_table(self):
         """Tests top_capacity_table method"""
 
-        table = self.job._get_table(table_name="capacity")
-        df = self.job.top_capacity_table(table, path="/aind/scratch")
+        df = self.job.top_capacity_table(
+            self.capacity_top_df, path="/aind/scratch"
+        )
         self.assertEqual(["Path", "Logical TiB"], list(df.columns))
+        self.assertEqual(["/aind/scratch/ophys"], list(df["Path"]))
+
+    def test_top_capacity_table_order(self):
+        """Tests top_capacity_table orders and indents folders by rank"""
+        df = pd.DataFrame(
+            {
+                "root": ["/r", "/r", "/r", "/s"],
+                "path": ["/r/1", "/r/0/0", "/r/0", "/s/0"],
+                "is_subfolder": [False, True, False, False],
+                "logical": [i * 1024**4 for i in [5, 8, 10, 1]],
+                "rank": [2, 1, 0, 0],
+            }
+        )
+        output_df = self.job.top_capacity_table(df, path="/r")
+        self.assertEqual(
+            ["/r/0", "    /r/0/0", "/r/1"], list(output_df["Path"])
+        )
+        self.assertEqual([10.0, 8.0, 5.0], list(output_df["Logical TiB"]))
 
     def test_format_tables_as_html(self):
         """Tests _format_tables_as_html method"""
-        table = self.job._get_table(table_name="capacity")
-        df = self.job.top_capacity_table(table, path="/aind/scratch")
-        quota_df = self.job._get_table(table_name="quota")
-        problem_quota_df = self.job._format_quota_table(quota_df)
         html_body = self.job._format_tables_as_html(
-            capacity_dfs=[("/aind/scratch", df.to_html(index=False))],
-            problem_quotas=problem_quota_df.to_html(index=False),
+            capacity_dfs=[("/aind/scratch", "<table/>")],
+            problem_quotas="<table/>",
         )
         self.assertIn(
             "We have reached a limit for data storage on VAST", html_body
         )
+        self.assertIn("<b> /aind/scratch </b>", html_body)
 
-    @patch("requests.post")
-    def test_run_job_with_notification(self, mock_post: MagicMock):
+    def test_session_retries(self):
+        """Tests the webhook session retries failed posts."""
+        adapter = self.job.session.get_adapter("https://example.com/alert")
+        self.assertEqual(5, adapter.max_retries.total)
+        self.assertIn("POST", adapter.max_retries.allowed_methods)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertNotIn(500, adapter.max_retries.status_forcelist)
+
+    def test_run_job_with_notification(self):
         """Tets run_job when a notification is sent."""
-        mock_response = Response()
-        mock_response.status_code = 200
-        mock_post.return_value = mock_response
+        self.mock_post.return_value = MagicMock(
+            spec=Response, status_code=200, ok=True
+        )
         self.job.run_job()
-        mock_post.assert_called_once()
+        self.mock_post.assert_called_once()
+        html_body = self.mock_post.call_args.kwargs["json"]["text"]
+        self.assertIn("/aind/scratch/ophys", html_body)
+        self.assertIn("SOFT_EXCEEDED", html_body)
 
-    @patch("requests.post")
-    def test_run_job_with_all_good(self, mock_post: MagicMock):
+    def test_run_job_with_all_good(self):
         """Tests run_job when all is good."""
         with self.assertLogs(level="INFO") as captured:
             self.other_job.run_job()
         self.assertEqual(2, len(captured.output))
-        mock_post.assert_not_called()
+        self.mock_post.assert_not_called()
 
 
 if __name__ == "__main__":